@@ -3,6 +3,9 @@ Module to store various command related functionality
 """
 
 import os
+import pickle
+from collections.abc import KeysView
+from pathlib import Path
 
 
 class Commands:
@@ -10,18 +13,24 @@ class Commands:
     Utility class for commands retrieval
     """
 
+    _cache = Path.home() / ".ysh_cmdcache"
+    _paths = ["/bin", "/usr/bin", "/sbin", "/usr/sbin"]
+
     def __init__(self) -> None:
-        self.commands = set()
-        self._fill_commands()
+        self._cmd_to_path: dict[str, str] = {}
+        signatures = self._get_signatures()
+        if not self._load_cache(signatures):
+            self._fill_commands()
+            self._save_cache(signatures)
 
-    def get_commands(self) -> set[str]:
+    def get_commands(self) -> KeysView[str]:
         """
         Returns the list of all the recognized executables in the bin directories
 
         Returns:
-                commands(set(str)): Set of all the commands
+                commands(KeysView(str)): View of all the command names
         """
-        return self.commands
+        return self._cmd_to_path.keys()
 
     def search_command(self, command_name: str) -> str:
         """
@@ -33,23 +42,56 @@ class Commands:
         Returns:
             str: Full path of the command if found, empty string if not found.
         """
-        for path in self.commands:
-            cmd_path = os.path.join(path, command_name)
-            if (
-                os.path.exists(cmd_path)
-                and os.access(cmd_path, os.X_OK)
-                and not os.path.isdir(cmd_path)
-            ):
-                return cmd_path
-        return ""
+        return self._cmd_to_path.get(command_name, "")
+
+    def _get_signatures(self) -> list[tuple[str, int, int]]:
+        signatures = []
+        for path in self._paths:
+            if os.path.isdir(path):
+                stat = os.stat(path)
+                signatures.append((path, stat.st_mtime_ns, stat.st_size))
+        return signatures
+
+    def _load_cache(self, signatures: list[tuple[str, int, int]]) -> bool:
+        """
+        Loads the commands from the cache file if the bin directories
+        have not changed since it was written
+
+        Returns:
+            bool: True if the cache was valid and loaded, False otherwise
+        """
+        try:
+            with open(self._cache, "rb") as f:
+                cached_signatures, cached_commands = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, ValueError, TypeError):
+            return False
+        if cached_signatures != signatures or not isinstance(cached_commands, dict):
+            return False
+        self._cmd_to_path = cached_commands
+        return True
+
+    def _save_cache(self, signatures: list[tuple[str, int, int]]) -> None:
+        try:
+            with open(self._cache, "wb") as f:
+                pickle.dump((signatures, self._cmd_to_path), f)
+        except OSError:
+            pass
 
     def _fill_commands(self) -> None:
-        paths = ["/bin", "usr/bin", "sbin", "usr/sbin"]
-        self.commands = set(paths)
+        self._cmd_to_path = {}
 
-        for path in paths:
-            if os.path.isdir(path):
-                for cmd in os.listdir(path):
-                    cmd_path = os.path.join(path, cmd)
-                    if os.access(cmd_path, os.X_OK) and not os.path.isdir(cmd_path):
-                        self.commands.add(cmd)
+        for path in self._paths:
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if self._is_executable(entry):
+                            self._cmd_to_path.setdefault(entry.name, entry.path)
+            except OSError:
+                continue
+
+    @staticmethod
+    def _is_executable(entry: os.DirEntry) -> bool:
+        try:
+            return not entry.is_dir() and bool(entry.stat().st_mode & 0o111)
+        except OSError:
+            return False
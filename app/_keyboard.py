@@ -0,0 +1,165 @@
+"""
+Module to read key presses directly from the terminal
+"""
+
+import codecs
+import os
+import select
+import sys
+import termios
+import threading
+import tty
+from typing import Callable
+
+_ESCAPE_SEQUENCES = {
+    "\x1b": "esc",
+    "\x1b[A": "up",
+    "\x1b[B": "down",
+    "\x1b[C": "right",
+    "\x1b[D": "left",
+    "\x1bOA": "up",
+    "\x1bOB": "down",
+    "\x1bOC": "right",
+    "\x1bOD": "left",
+    "\x1b[H": "home",
+    "\x1b[F": "end",
+    "\x1bOH": "home",
+    "\x1bOF": "end",
+    "\x1b[1~": "home",
+    "\x1b[4~": "end",
+    "\x1b[3~": "delete",
+    "\x1b[5~": "pageup",
+    "\x1b[6~": "pagedown",
+}
+_CONTROL_KEYS = {
+    "\r": "enter",
+    "\n": "enter",
+    "\x7f": "backspace",
+    "\x08": "backspace",
+    "\t": "tab",
+}
+# how long the rest of an escape sequence may lag behind the escape itself
+_ESC_DELAY = 0.05
+_LISTENING = threading.Event()
+
+
+def _escape_end(data: str, start: int) -> int:
+    """
+    Returns the index just past the escape sequence starting at start,
+    or -1 if the sequence may continue in the next read
+    """
+    if start + 1 >= len(data):
+        return -1
+    follower = data[start + 1]
+    if follower == "[":
+        end = start + 2
+        # CSI parameters run until a final byte in the @ to ~ range
+        while end < len(data) and not "@" <= data[end] <= "~":
+            end += 1
+        return end + 1 if end < len(data) else -1
+    if follower == "O":
+        return start + 3 if start + 2 < len(data) else -1
+    if follower.isprintable():
+        # Alt+key arrives as escape followed by the key
+        return start + 2
+    return start + 1
+
+
+def parse_keys(data: str) -> tuple[list[str], str]:
+    """
+    Splits raw terminal input into key names
+
+    Args:
+        data (str): Decoded bytes read from the terminal.
+
+    Returns:
+        list(str): Key names, e.g. "up" or "enter", and printable characters.
+            Unknown escape sequences and control characters are dropped.
+        str: Trailing escape sequence that is not complete yet.
+    """
+    keys = []
+    i = 0
+    while i < len(data):
+        char = data[i]
+        if char == "\x1b":
+            end = _escape_end(data, i)
+            if end == -1:
+                return keys, data[i:]
+            key = _ESCAPE_SEQUENCES.get(data[i:end])
+            if key:
+                keys.append(key)
+            i = end
+            continue
+        if char in _CONTROL_KEYS:
+            keys.append(_CONTROL_KEYS[char])
+        elif char.isprintable():
+            keys.append(char)
+        i += 1
+    return keys, ""
+
+
+def _resolve_pending(fd: int, keys: list[str], pending: str) -> str:
+    """Keeps an incomplete escape sequence only while more input follows"""
+    if not pending or select.select([fd], [], [], _ESC_DELAY)[0]:
+        return pending
+    # nothing else arrived in time, so a lone escape was the esc key
+    if pending == "\x1b":
+        keys.append("esc")
+    return ""
+
+
+def stop_listening() -> None:
+    """Stops listen_keyboard once the current key has been handled"""
+    _LISTENING.clear()
+
+
+def listen_keyboard(
+    on_press: Callable[[str], None],
+    on_release: Callable[[str], None] | None = None,
+    on_idle: Callable[[], None] | None = None,
+) -> None:
+    """
+    Reads key presses from stdin in cbreak mode until stop_listening is called
+
+    The terminal is restored to its original mode while "enter" is handled,
+    so commands run by the callback get a normal terminal. An escape sequence
+    cut off at the end of a read is completed by the next one.
+
+    Args:
+        on_press: Called with the name of every key pressed.
+        on_release: Called with the key name once on_press returns.
+        on_idle: Called once all keys from a single read have been handled.
+    """
+    fd = sys.stdin.fileno()
+    is_tty = os.isatty(fd)
+    old_attrs = termios.tcgetattr(fd) if is_tty else None
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    pending = ""
+    _LISTENING.set()
+    try:
+        if is_tty:
+            tty.setcbreak(fd)
+        while _LISTENING.is_set():
+            try:
+                data = os.read(fd, 64)
+            except KeyboardInterrupt:
+                continue
+            if not data:
+                break
+            keys, pending = parse_keys(pending + decoder.decode(data))
+            pending = _resolve_pending(fd, keys, pending)
+            for key in keys:
+                if key == "enter" and is_tty:
+                    termios.tcsetattr(fd, termios.TCSADRAIN, old_attrs)
+                on_press(key)
+                if on_release:
+                    on_release(key)
+                if not _LISTENING.is_set():
+                    break
+                if key == "enter" and is_tty:
+                    tty.setcbreak(fd)
+            if on_idle and _LISTENING.is_set():
+                on_idle()
+    finally:
+        if is_tty:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old_attrs)
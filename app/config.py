@@ -5,6 +5,8 @@ utility class to store helper methods for storage and retrival of config attribu
 import re
 from pathlib import Path
 
+_ALIAS_RE = re.compile(r'alias\s+([^"=]+?)\s*=\s*"(.+)"')
+
 
 class Config:
     """
@@ -12,10 +14,9 @@ class Config:
     """
 
     _conf = Path.home() / ".yshrc"
-    _alias_to_cmd = {}
-    _pattern = r'alias\s+([^"]+)\s*=\s*"(.+)"'
 
     def __init__(self) -> None:
+        self._alias_to_cmd: dict[str, str] = {}
         if not self._conf.is_file():
             self._conf.touch()
         self._load_alias()
@@ -35,10 +36,7 @@ class Config:
 
     def _load_alias(self) -> None:
         with open(self._conf, "r", encoding="utf-8") as f:
-            conf_lines = f.readlines()
-        for line in conf_lines:
-            match = re.search(self._pattern, line)
-            if match:
-                alias = match.group(1)
-                cmd = match.group(2)
-                self._alias_to_cmd[alias] = cmd
+            for line in f:
+                match = _ALIAS_RE.match(line)
+                if match:
+                    self._alias_to_cmd[match.group(1)] = match.group(2)
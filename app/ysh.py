@@ -2,70 +2,189 @@
 ysh - A basic shell
 
 This script provides a simple shell interface that can execute most Unix commands.
-It also saves all the commands in the ~/.ysh_history and provides support for 
+It also saves all the commands in the ~/.ysh_history and provides support for
 the history command.
 """
 
+import mmap
 import os
+import re
 import shlex
-import subprocess
+import signal
 import sys
+import threading
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from functools import lru_cache
 from pathlib import Path
 
-from sshkeyboard import listen_keyboard, stop_listening
-
 try:
     from app._commands import Commands
+    from app._keyboard import listen_keyboard, stop_listening
     from app.config import Config
 except ModuleNotFoundError:
     from _commands import Commands
+    from _keyboard import listen_keyboard, stop_listening
     from config import Config
 
-hist_loc = Path.home() / ".ysh_history"
-PROMPT = "ysh>"
+
+def _read_histsize() -> int:
+    # a bad value must not keep the shell from starting
+    try:
+        return max(0, int(os.environ.get("YSH_HISTSIZE", 5000)))
+    except ValueError:
+        return 5000
+
+
+HIST_PATH = os.path.expanduser("~/.ysh_history")
+HISTSIZE = _read_histsize()
+PROMPT = os.environ.get("YSH_PS1", "ysh>")
 YELLOW = "\033[93m"
 DEFAULT = "\033[0m"
 RED = "\033[91m"
 BLUE = "\033[94m"
-
-
-class CommandHandler:
+_PROMPT_TEXT = f"{YELLOW}{PROMPT}{DEFAULT}"
+_CLEARED_PROMPT = f"\r\033[K{_PROMPT_TEXT}"
+_IGNORED_KEYS = frozenset(
+    {"right", "left", "home", "end", "pagedown", "pageup", "delete", "esc"}
+)
+_TAB_PREFIXES = ("cd ", "ls ", "pwd ", "grep ")
+# directory listings kept for tab completion, least recently used dropped first
+_LISTDIR_CACHE_SIZE = 16
+_BUILTINS = frozenset({"history", "cd", "exit"})
+# pipes, redirection, globs and expansions are left to /bin/sh
+_NEEDS_SHELL = re.compile(r"[|&;<>$`*?()\[\]{}~]")
+
+
+@lru_cache(maxsize=1)
+def _get_commands_singleton() -> frozenset[str]:
+    # shared by every handler, so it must never be mutated
+    return _BUILTINS.union(Commands().get_commands())
+
+
+@lru_cache(maxsize=1)
+def _sorted_commands(commands: frozenset[str]) -> list[str]:
+    # sorted on the first lookup rather than at startup, never mutated
+    return sorted(commands)
+
+
+def _common_prefix(strs: list[str]) -> str:
+    # the lexicographic min and max share exactly the prefix common to all
+    if not strs:
+        return ""
+    first, last = min(strs), max(strs)
+    for i, char in enumerate(first):
+        if char != last[i]:
+            return first[:i]
+    return first
+
+
+def _prefix_matches(entries: list[str], prefix: str) -> list[str]:
+    # entries is sorted, so everything starting with prefix is one contiguous slice
+    if not prefix:
+        return entries[:]
+    start = bisect_left(entries, prefix)
+    end = bisect_left(entries, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+    return entries[start:end]
+
+
+def _private_opener(path: str, flags: int) -> int:
+    # a newly created history file is only readable by its owner
+    return os.open(path, flags, 0o600)
+
+
+def _read_tail_lines(path: str, count: int) -> list[str]:
+    """Returns the last count lines of a file, only decoding that tail"""
+    try:
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            pos = len(mm) - 1  # a trailing newline does not start another line
+            for _ in range(count):
+                pos = mm.rfind(b"\n", 0, pos)
+                if pos == -1:
+                    break
+            return mm[pos + 1 :].decode("utf-8", "replace").splitlines()
+    except (FileNotFoundError, ValueError):  # mmap rejects empty files
+        return []
+
+
+def _split_command(command: str) -> list[str]:
+    # shlex is only needed when quoting or escaping is involved
+    if '"' not in command and "'" not in command and "\\" not in command:
+        return command.split()
+    try:
+        return shlex.split(command)
+    except ValueError:
+        return []
+
+
+class CommandHandler:  # pylint: disable=too-many-instance-attributes
     """Handles unix command executions and parsing user input for the shell"""
 
+    __slots__ = (
+        "buffer",
+        "history",
+        "history_index",
+        "_hist_fp",
+        "alias_cmds",
+        "commands",
+        "colorized",
+        "sep",
+        "command",
+        "_listdir_cache",
+        "_dispatch",
+        "_pending_render",
+    )
+
     def __init__(self):
-        self.buffer = []
-        self.history_settings = {
-            "history": [],
-            "history_index": 0,
-            "old_history_index": 0,
-            "previous_command": "",
-        }
+        self.buffer = ""
+        self.history = deque(maxlen=HISTSIZE)
+        self.history_index = 0
         self.init_history()
+        # commands are appended as they are run so a killed shell keeps its history
+        self._hist_fp = open(  # pylint: disable=consider-using-with
+            HIST_PATH, "a", encoding="utf-8", buffering=1, opener=_private_opener
+        )
         self.alias_cmds = Config().get_alias()
         self._fill_commands()
         self.colorized = False
         self.sep = False
         self.command = ""
+        self._pending_render = False
+        self._listdir_cache: OrderedDict[str, tuple[int, list[str]]] = OrderedDict()
+        self._dispatch = {
+            "enter": lambda _: self._enter(),
+            "backspace": lambda _: self._backspace(),
+            "up": self.handle_history_event,
+            "down": self.handle_history_event,
+            "tab": lambda _: self.handle_tab_event(),
+            **dict.fromkeys(_IGNORED_KEYS, lambda _: None),
+        }
 
     def _fill_commands(self) -> None:
-        self.commands = Commands().get_commands()
-        self.commands.add("history")
-        self.commands.add("cd")
-        self.commands.add("exit")
-        self.commands.update(self.alias_cmds)
+        # builtins and aliases are known immediately, the bin directories are
+        # scanned in the background so the prompt is not delayed
+        self.commands = _BUILTINS.union(self.alias_cmds)
+        threading.Thread(target=self._load_commands, daemon=True).start()
+
+    def _load_commands(self) -> None:
+        commands = _get_commands_singleton()
+        if self.alias_cmds:
+            commands = commands.union(self.alias_cmds)
+        self.commands = commands
+
+    def get_command_completions(self, prefix: str) -> list[str]:
+        """Get the sorted list of known commands starting with the given prefix"""
+        return _prefix_matches(_sorted_commands(self.commands), prefix)
 
     def add_history(self, cmd: str):
         """Adds command to the current history list
-        ignores repeated history command"""
-        if (
-            self.history_settings["history"]
-            and self.history_settings["history"][-1] == "history"
-            and cmd == "history"
-            or cmd == ""
-        ):
-            return
-        self.history_settings["history"].append(cmd)
-        self.history_settings["history_index"] = len(self.history_settings["history"])
+        ignores consecutive duplicate commands"""
+        if cmd != "" and not (self.history and self.history[-1] == cmd):
+            self.history.append(cmd)
+            self._hist_fp.write(cmd + "\n")
+        self.history_index = len(self.history)
 
     def ch_dir(self, directory: Path | str):
         """Handles cd command"""
@@ -81,14 +200,15 @@ class CommandHandler:
 
     def _change_dir(self, args: list[str]) -> None:
         if len(args) < 2:
-            directory = Path.home()
+            directory = os.path.expanduser("~")
         else:
             directory = args[1]
         self.ch_dir(directory)
 
     def _print_history(self) -> None:
-        for cmd in self.get_history():
-            print(cmd)
+        if self.history:
+            # one write instead of a line-buffered write per entry
+            sys.stdout.write("\n".join(self.history) + "\n")
 
     def exec_command(self, command: str):
         """Execute the user command by creating a sub process and save to history"""
@@ -105,75 +225,50 @@ class CommandHandler:
         if command == "history":
             self._print_history()
             return True
+        if _NEEDS_SHELL.search(command):
+            argv = ["/bin/sh", "-c", command]
+        else:
+            argv = _split_command(command) or [command]
+        cmd = argv[0]
         try:
-            cmd, args = shlex.split(command)
-        except ValueError:
-            cmd = command
-            args = ""
-        try:
-            output, error = self._run_subprocess(cmd, args)
-            print(output, end="")
-            print(error, end="")
+            if self._run_subprocess(argv) == -signal.SIGINT:
+                print("Process terminated")
         except ValueError:
             print(f"Failed to run command: {cmd}")
-        except subprocess.CalledProcessError as err:
-            print(err.stderr.decode(), end="")
         except FileNotFoundError:
             print(f"Could not find command: {cmd}")
         except PermissionError:
             print(f"Could not find command: {cmd}")
-        except KeyboardInterrupt:
-            print("Process terminated")
         return True
 
-    def _run_subprocess(self, cmd: str, args) -> tuple[str, str]:
-        return subprocess.Popen(
-            [cmd, args] if args else [cmd],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-        ).communicate()
+    def _run_subprocess(self, argv: list[str]) -> int:
+        # the child inherits the terminal's fds, so its output is not piped back
+        sys.stdout.flush()
+        # Ctrl-C belongs to the child; the shell keeps waiting until it exits
+        previous = signal.signal(signal.SIGINT, signal.SIG_IGN)
+        try:
+            pid = os.posix_spawnp(argv[0], argv, os.environ, setsigdef=(signal.SIGINT,))
+            _, status = os.waitpid(pid, 0)
+        finally:
+            signal.signal(signal.SIGINT, previous)
+        return os.waitstatus_to_exitcode(status)
 
     def handle_history_event(self, key: str):
         """Shows the previous/next command if the up or down arrow is pressed"""
-        cmd = ""
+        # history_index == len(history) is the empty line after the last entry
+        count = len(self.history)
         if key == "up":
-            if self.history_settings["history_index"] > 0:
-                self.history_settings["history_index"] -= 1
-            if (
-                len(self.history_settings["history"]) > 0
-                and len(self.history_settings["history"])
-                > self.history_settings["history_index"]
-            ):
-                cmd = self.history_settings["history"][
-                    self.history_settings["history_index"]
-                ]
+            self.history_index = max(0, self.history_index - 1)
         elif key == "down":
-            if (
-                self.history_settings["history_index"]
-                < len(self.history_settings["history"]) - 1
-            ):
-                self.history_settings["history_index"] += 1
-            if (
-                len(self.history_settings["history"]) > 0
-                and len(self.history_settings["history"])
-                > self.history_settings["history_index"]
-            ):
-                cmd = self.history_settings["history"][
-                    self.history_settings["history_index"]
-                ]
-            elif self.history_settings["history"]:
-                cmd = self.history_settings["history"][
-                    self.history_settings["history_index"] - 1
-                ]  # get last command
-        padding = len(self.history_settings["previous_command"]) - len(cmd)
-        padding = max(padding, 0)
-        print(f"\r{YELLOW}{PROMPT}{DEFAULT}{cmd}{' ' * padding}", end="", flush=True)
-        sys.stdout.write("\b" * padding)
-        sys.stdout.flush()
-        self.buffer = list(cmd)
-        self.history_settings["previous_command"] = cmd
+            self.history_index = min(count, self.history_index + 1)
+        self.buffer = (
+            self.history[self.history_index] if self.history_index < count else ""
+        )
+        self.command = ""
+        self.colorized = False
+        # held arrow keys arrive in bursts, only the last entry of a read
+        # gets drawn; a sequence cut off by the read is finished by the next
+        self._pending_render = True
 
     def terminate(self):
         """Exits the shell"""
@@ -191,141 +286,134 @@ class CommandHandler:
         backspace deletes last character on the shell
         exit terminates the session"""
 
-        if key == "enter":
-            self._enter()
-        elif key == "backspace":
-            self._backspace()
-        elif key == "up":
-            self.handle_history_event("up")
-        elif key == "down":
-            self.handle_history_event("down")
-        elif key in {"right", "left", "home", "end", "pagedown", "pageup", "delete"}:
-            pass
-        elif key == "tab":
-            self.handle_tab_event()
-        else:
-            self._default(key)
+        if key not in ("up", "down"):
+            self._render_pending()
+        self._dispatch.get(key, self._default)(key)
+
+    def refresh(self) -> None:
+        """Draws deferred updates and flushes the output of the processed keys"""
+        self._render_pending()
+        sys.stdout.flush()
+
+    def _render_pending(self) -> None:
+        if self._pending_render:
+            self._pending_render = False
+            self._render()
+
+    def _emit(self, text: str) -> None:
+        """Queues text for the terminal, flushed by refresh"""
+        sys.stdout.write(text)
 
     def _default(self, key) -> None:
-        if key == "space":
-            key = " "
+        if key == " ":
             self.sep = True
-        self.buffer.append(key)
-        buffer = "".join(self.buffer)
-        if self._is_command(buffer):
+        self.buffer += key
+        if self.buffer in self.commands:
             self._colorize_cmd(RED)
             self.colorized = True
-            self.command = buffer
+            self.command = self.buffer
         else:
             if self.colorized and not self.sep:
                 self._colorize_cmd(DEFAULT)
                 self.colorized = False
             else:
-                print(key, end="", flush=True)
+                self._emit(key)
 
     def _enter(self) -> None:
-        print()
-        command = "".join(self.buffer).strip()
+        self._emit("\n")
+        command = self.buffer.strip()
         self.command = ""
         self.sep = False
         if command != "" and not self.exec_command(command):
             self.terminate()
         else:
-            self.buffer = []
-            print(f"{YELLOW}{PROMPT}{DEFAULT}", end="", flush=True)
+            self.buffer = ""
+            self._emit(_PROMPT_TEXT)
 
     def _backspace(self) -> None:
-        if self.buffer:
-            self.buffer.pop()
-            if " " not in self.buffer:
-                self.sep = False
+        if not self.buffer:
+            return
+        removed = self.buffer[-1]
+        self.buffer = self.buffer[:-1]
+        if " " not in self.buffer:
+            self.sep = False
+        if len(self.buffer) <= len(self.command):
+            # the highlighted command is affected, so the line has to be redrawn
             if len(self.buffer) < len(self.command):
                 self.command = ""
+            self._render()
+        elif removed.isascii():
+            self._emit("\b \b")
+        else:
+            self._render()  # wide characters may span more than one column
+
+    def _render(self) -> None:
+        """Redraws the whole prompt line, highlighting the recognized command"""
         if self.command != "":
-            print("\r\033[K", end="", flush=True)
-            print(
-                f"{YELLOW}{PROMPT}{RED}{self.command}{DEFAULT}"
-                f'{"".join(self.buffer[len(self.command):])}',
-                end="",
-                flush=True,
+            self._emit(
+                f"{_CLEARED_PROMPT}{RED}{self.command}{DEFAULT}"
+                f"{self.buffer[len(self.command):]}"
             )
         else:
-            print("\r\033[K", end="", flush=True)
-            print(
-                f'{YELLOW}{PROMPT}{DEFAULT}{"".join(map(str, self.buffer))}',
-                end="",
-                flush=True,
-            )
-
-    def _is_command(self, buffer: str) -> bool:
-        if buffer in self.commands:
-            return True
-        return False
+            self._emit(_CLEARED_PROMPT + self.buffer)
 
     def _colorize_cmd(self, color: str) -> None:
-        padding = len(self.buffer) - 1
-        print(
-            f"\r{YELLOW}{PROMPT}{color}{''.join(self.buffer)}{DEFAULT}{' ' * padding}",
-            end="",
-            flush=True,
-        )
-        sys.stdout.write("\b" * padding)
-        sys.stdout.flush()
+        # clearing to the end of the line leaves nothing to pad and move back over
+        self._emit(f"\r{_PROMPT_TEXT}{color}{self.buffer}{DEFAULT}\033[K")
 
     def get_completions(self, text):
         """Get a list of possible completions for the given text"""
         if "~" in text:
             text = os.path.expanduser(text)
 
-        if os.path.sep not in text:
-            completions = [cmd for cmd in os.listdir(".") if cmd.startswith(text)]
-        else:
-            dirname, rest = os.path.split(text)
-            if not dirname:
-                dirname = "."
-            try:
-                completions = [
-                    os.path.join(dirname, cmd)
-                    for cmd in os.listdir(dirname)
-                    if cmd.startswith(rest)
-                ]
-            except FileNotFoundError:
-                completions = []
-
-        return completions
+        dirname, rest = os.path.split(text)
+        try:
+            entries = _prefix_matches(self._list_dir(dirname or "."), rest)
+        except OSError:
+            # missing, unreadable or not a directory, nothing to complete
+            return []
+        if not dirname:
+            return entries
+        return [os.path.join(dirname, entry) for entry in entries]
+
+    def _list_dir(self, dirname: str) -> list[str]:
+        """Returns the sorted directory entries, cached until the directory changes
+        directories get a trailing separator so completing them can continue inside"""
+        path = os.path.abspath(dirname)
+        mtime = os.stat(path).st_mtime_ns
+        cached = self._listdir_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            self._listdir_cache.move_to_end(path)
+            return cached[1]
+        with os.scandir(path) as it:
+            entries = sorted(
+                entry.name + os.path.sep if entry.is_dir() else entry.name
+                for entry in it
+            )
+        self._listdir_cache[path] = (mtime, entries)
+        self._listdir_cache.move_to_end(path)
+        if len(self._listdir_cache) > _LISTDIR_CACHE_SIZE:
+            self._listdir_cache.popitem(last=False)
+        return entries
 
     def get_prefix_cmd(self):
         """returns prefix cmd for use in a tab completion event"""
-        buffer_str = "".join(self.buffer)
-        valid_cmds = {"cd ", "ls ", "pwd ", "grep "}
-        for cmd in valid_cmds:
-            if buffer_str.startswith(cmd):
-                return cmd
-        return ""
+        return next((cmd for cmd in _TAB_PREFIXES if self.buffer.startswith(cmd)), "")
 
     def handle_tab_event(self):
         """Handles the tab completion event"""
         prefix_cmd = self.get_prefix_cmd()
         if not prefix_cmd:
             return
-        text_to_complete = "".join(self.buffer)[len(prefix_cmd) :]
+        text_to_complete = self.buffer[len(prefix_cmd) :]
         completions = self.get_completions(text_to_complete)
         if completions:
-            common_prefix = os.path.commonprefix(completions)
-            self.buffer = list(prefix_cmd + common_prefix)
-            print("\r\033[K", end="", flush=True)
-            print(
-                f'{YELLOW}{PROMPT}{DEFAULT}{"".join(map(str, self.buffer))}',
-                end="",
-                flush=True,
-            )
+            common_prefix = _common_prefix(completions)
+            self.buffer = prefix_cmd + common_prefix
+            self._render()
             if len(completions) > 1:
-                print("\n" + "  ".join(completions))
-                print(
-                    f'{YELLOW}{PROMPT}{DEFAULT}{"".join(map(str, self.buffer))}',
-                    end="",
-                    flush=True,
-                )
+                self._emit("\n" + "  ".join(completions) + "\n")
+                self._render()
 
     def on_release(self, key: str):
         """Handles key release events"""
@@ -334,44 +422,27 @@ class CommandHandler:
             sys.exit()
 
     def save_history(self):
-        """Saves the current history to the .ysh_history"""
-        if not hist_loc.is_file():
-            hist_loc.touch()
-        with open(hist_loc, "a", encoding="utf-8") as f:
-            for i in range(
-                self.history_settings["old_history_index"],
-                len(self.history_settings["history"]),
-            ):
-                f.write(self.history_settings["history"][i] + "\n")
-            # f.write("\n".join(self.history[self.old_history_index :]))
+        """Closes the .ysh_history, commands are already written by add_history"""
+        self._hist_fp.close()
 
     def get_history(self):
         """returns the entire list of ran commands"""
-        return self.history_settings["history"]
+        return self.history
 
     def init_history(self):
         """Loads the ysh_history file"""
-        if hist_loc.is_file():
-            with open(hist_loc, "r", encoding="utf-8") as f:
-                self.history_settings["history"].extend(
-                    line.strip() for line in f.readlines()
-                )
-        self.history_settings["old_history_index"] = len(
-            self.history_settings["history"]
-        )
-        self.history_settings["history_index"] = (
-            self.history_settings["old_history_index"] - 1
-        )
+        self.history.extend(_read_tail_lines(HIST_PATH, HISTSIZE))
+        self.history_index = len(self.history)
 
 
 def main():
     """Main entry point"""
     handler = CommandHandler()
-    print(f"{YELLOW}{PROMPT}{DEFAULT}", end="", flush=True)
+    print(_PROMPT_TEXT, end="", flush=True)
     listen_keyboard(
         on_press=handler.process_key,
         on_release=handler.on_release,
-        delay_second_char=0.05,
+        on_idle=handler.refresh,
     )
 
 
@@ -22,9 +22,6 @@ setup(
             "ysh = app.ysh:main",
         ]
     },
-    install_requires=[
-        "sshkeyboard",
-    ],
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,91 @@
+"""
+test module for the commands lookup
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from app._commands import Commands
+
+
+class TestCommands(unittest.TestCase):
+    """
+    unit test class for the commands class
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.bin_dir = os.path.join(self.tmpdir, "bin")
+        os.mkdir(self.bin_dir)
+        self._add_executable("mycmd")
+        self.patches = [
+            patch.object(Commands, "_cache", Path(self.tmpdir) / "cmdcache"),
+            patch.object(Commands, "_paths", [self.bin_dir]),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def _add_executable(self, name: str) -> None:
+        cmd_path = os.path.join(self.bin_dir, name)
+        with open(cmd_path, "w", encoding="utf-8"):
+            pass
+        os.chmod(cmd_path, 0o755)
+
+    def test_fill_commands(self):
+        """
+        test if executables in the bin directories are recognized
+        """
+        self.assertIn("mycmd", Commands().get_commands())
+
+    def test_fill_commands_skips_non_executables(self):
+        """
+        test if plain files and directories are not recognized as commands
+        """
+        with open(os.path.join(self.bin_dir, "notes"), "w", encoding="utf-8"):
+            pass
+        os.mkdir(os.path.join(self.bin_dir, "subdir"))
+        commands = Commands().get_commands()
+        self.assertNotIn("notes", commands)
+        self.assertNotIn("subdir", commands)
+
+    def test_search_command(self):
+        """
+        test if a command resolves to its full path
+        """
+        commands = Commands()
+        self.assertEqual(
+            commands.search_command("mycmd"), os.path.join(self.bin_dir, "mycmd")
+        )
+        self.assertEqual(commands.search_command("missing"), "")
+
+    def test_cache_skips_scan(self):
+        """
+        test if an unchanged bin directory is loaded from the cache
+        """
+        Commands()
+        with patch.object(Commands, "_fill_commands") as mock_fill:
+            commands = Commands().get_commands()
+        mock_fill.assert_not_called()
+        self.assertIn("mycmd", commands)
+
+    def test_cache_invalidated(self):
+        """
+        test if a change in a bin directory triggers a rescan
+        """
+        Commands()
+        self._add_executable("newcmd")
+        os.utime(self.bin_dir, ns=(0, 0))
+        self.assertIn("newcmd", Commands().get_commands())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -28,6 +28,30 @@ class TestConfig(unittest.TestCase):
         expected_aliases = {"ll": "ls -l", "la": "ls -a"}
         self.assertEqual(config.get_alias(), expected_aliases)
 
+    @patch(
+        "builtins.open",
+        new_callable=mock_open,
+        read_data='alias gs = "git status"\n',
+    )
+    @patch.object(Path, "is_file", return_value=True)
+    def test_load_alias_with_spaces(self, _mock_is_file, _m_open):
+        """
+        test if spaces around the equal sign are not part of the alias
+        """
+        config = Config()
+        self.assertEqual(config.get_alias()["gs"], "git status")
+        self.assertNotIn("gs ", config.get_alias())
+
+    @patch("builtins.open", new_callable=mock_open, read_data='alias ll="ls -l"\n')
+    @patch.object(Path, "is_file", return_value=True)
+    def test_alias_not_shared(self, _mock_is_file, _m_open):
+        """
+        test if aliases are not shared between config instances
+        """
+        first = Config()
+        first.get_alias()["tmp"] = "true"
+        self.assertEqual(Config().get_alias(), {"ll": "ls -l"})
+
     @patch("builtins.open", new_callable=mock_open, read_data="")
     @patch.object(Path, "is_file", return_value=False)
     def test_init_creates_file_if_not_exists(self, _mock_is_file, m_open):
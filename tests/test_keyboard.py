@@ -0,0 +1,173 @@
+"""
+test module for the terminal key reader
+"""
+
+import os
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app._keyboard import listen_keyboard, parse_keys, stop_listening
+
+
+class TestKeyboard(unittest.TestCase):
+    """
+    unit test class for the key parsing
+    """
+
+    def test_parse_printable_keys(self):
+        """
+        test if characters and control keys are named like key presses
+        """
+        self.assertEqual(
+            parse_keys("ls -l\t\x7f\r"),
+            (["l", "s", " ", "-", "l", "tab", "backspace", "enter"], ""),
+        )
+
+    def test_parse_escape_sequences(self):
+        """
+        test if arrow and editing keys are decoded from escape sequences
+        """
+        self.assertEqual(
+            parse_keys("\x1b[A\x1bOB\x1b[3~\x1b[5~a"),
+            (["up", "down", "delete", "pageup", "a"], ""),
+        )
+
+    def test_parse_incomplete_sequence(self):
+        """
+        test if an escape sequence cut off at the end is returned as pending
+        """
+        self.assertEqual(parse_keys("a\x1b"), (["a"], "\x1b"))
+        self.assertEqual(parse_keys("a\x1b["), (["a"], "\x1b["))
+        self.assertEqual(parse_keys("\x1b[3"), ([], "\x1b[3"))
+        self.assertEqual(parse_keys("\x1bO"), ([], "\x1bO"))
+
+    def test_parse_alt_key(self):
+        """
+        test if escape followed by a printable character is not read as esc
+        """
+        self.assertEqual(parse_keys("\x1bxa"), (["a"], ""))
+
+    def test_parse_unknown_sequences(self):
+        """
+        test if unknown escape sequences and control characters are dropped
+        """
+        self.assertEqual(parse_keys("\x1b[1;5Cx\x03"), (["x"], ""))
+
+    def test_listen_keyboard(self):
+        """
+        test if keys are dispatched and on_idle runs once per read
+        """
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, "ab\x1b[A".encode())
+        os.close(write_fd)
+        pressed = []
+        on_idle = MagicMock()
+        try:
+            with patch("sys.stdin") as mock_stdin:
+                mock_stdin.fileno.return_value = read_fd
+                listen_keyboard(on_press=pressed.append, on_idle=on_idle)
+        finally:
+            os.close(read_fd)
+        self.assertEqual(pressed, ["a", "b", "up"])
+        on_idle.assert_called_once()
+
+    def test_listen_keyboard_burst(self):
+        """
+        test if a burst of arrow keys longer than one read is decoded intact
+        """
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"\x1b[A" * 30)
+        os.close(write_fd)
+        pressed = []
+        on_idle = MagicMock()
+        try:
+            with patch("sys.stdin") as mock_stdin:
+                mock_stdin.fileno.return_value = read_fd
+                listen_keyboard(on_press=pressed.append, on_idle=on_idle)
+        finally:
+            os.close(read_fd)
+        self.assertEqual(pressed, ["up"] * 30)
+        self.assertEqual(on_idle.call_count, 2)
+
+    @patch("app._keyboard.select.select", return_value=([0], [], []))
+    @patch("os.read", side_effect=[b"a\x1b", b"[Bb", b""])
+    def test_listen_keyboard_split_sequence(self, _mock_read, _mock_select):
+        """
+        test if an escape sequence split across two reads is decoded once
+        """
+        pressed = []
+        with patch("sys.stdin") as mock_stdin:
+            mock_stdin.fileno.return_value = 0
+            with patch("os.isatty", return_value=False):
+                listen_keyboard(on_press=pressed.append)
+        self.assertEqual(pressed, ["a", "down", "b"])
+
+    def test_listen_keyboard_delayed_sequence(self):
+        """
+        test if an escape sequence whose tail arrives a little later is not esc
+        """
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"\x1b")
+
+        def write_tail():
+            os.write(write_fd, b"[A")
+            os.close(write_fd)
+
+        timer = threading.Timer(0.02, write_tail)
+        timer.start()
+        pressed = []
+        try:
+            with patch("sys.stdin") as mock_stdin:
+                mock_stdin.fileno.return_value = read_fd
+                listen_keyboard(on_press=pressed.append)
+        finally:
+            timer.join()
+            os.close(read_fd)
+        self.assertEqual(pressed, ["up"])
+
+    def test_listen_keyboard_esc(self):
+        """
+        test if a lone escape is reported as esc once no more input is queued
+        """
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"\x1b")
+        pressed = []
+
+        def on_press(key):
+            pressed.append(key)
+            stop_listening()
+
+        try:
+            with patch("sys.stdin") as mock_stdin:
+                mock_stdin.fileno.return_value = read_fd
+                listen_keyboard(on_press=on_press)
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+        self.assertEqual(pressed, ["esc"])
+
+    def test_stop_listening(self):
+        """
+        test if no keys are dispatched after stop_listening
+        """
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"abc")
+        os.close(write_fd)
+        pressed = []
+
+        def on_press(key):
+            pressed.append(key)
+            stop_listening()
+
+        try:
+            with patch("sys.stdin") as mock_stdin:
+                mock_stdin.fileno.return_value = read_fd
+                listen_keyboard(on_press=on_press)
+        finally:
+            os.close(read_fd)
+        self.assertEqual(pressed, ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
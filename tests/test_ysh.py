@@ -4,53 +4,133 @@ test suite for tsh
 """
 
 import os
-import subprocess
+import shutil
+import signal
 import tempfile
+import threading
 import unittest
-from unittest.mock import MagicMock, patch
+from pathlib import Path
+from unittest.mock import patch
 
-from app.ysh import CommandHandler
+from app import ysh
+from app.ysh import (
+    CommandHandler,
+    _common_prefix,
+    _prefix_matches,
+    _read_histsize,
+    _read_tail_lines,
+    _split_command,
+)
 
 
-class TestYsh(unittest.TestCase):
+class TestYsh(unittest.TestCase):  # pylint: disable=too-many-public-methods
     """test class for ysh"""
 
     def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.hist_patch = patch(
+            "app.ysh.HIST_PATH", os.path.join(self.tmpdir, ".ysh_history")
+        )
+        self.hist_patch.start()
+        self.commands_patch = patch("app.ysh._get_commands_singleton")
+        mock_singleton = self.commands_patch.start()
+        mock_singleton.return_value = frozenset({"history", "cd", "exit", "ls", "echo"})
         self.handler = CommandHandler()
         self.original_cwd = os.getcwd()
 
     def tearDown(self):
+        self.handler.save_history()
         os.chdir(self.original_cwd)
+        self.hist_patch.stop()
+        self.commands_patch.stop()
+        shutil.rmtree(self.tmpdir)
 
-    @patch("subprocess.Popen")
-    def test_exec_command(self, mock_run):
+    @patch("os.waitpid", return_value=(1234, 0))
+    @patch("os.posix_spawnp", return_value=1234)
+    def test_exec_command(self, mock_spawn, mock_wait):
         """test if command execution properly works"""
-        mock_run.return_value = MagicMock(
-            returncode=0, stdout=b"Test Output\n", stderr=b""
-        )
-
         result = self.handler.exec_command("echo Test")
 
         self.assertTrue(result)
-        self.assertIn("echo Test", self.handler.history_settings["history"])
+        self.assertIn("echo Test", self.handler.history)
         self.assertEqual(
-            self.handler.history_settings["history_index"],
-            len(self.handler.history_settings["history"]),
+            self.handler.history_index,
+            len(self.handler.history),
         )
-        mock_run.assert_called_with(
-            ["echo", "Test"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
+        mock_spawn.assert_called_with(
+            "echo", ["echo", "Test"], os.environ, setsigdef=(signal.SIGINT,)
         )
+        mock_wait.assert_called_with(1234, 0)
+
+    @patch("os.waitpid", return_value=(1234, 0))
+    @patch("os.posix_spawnp", return_value=1234)
+    def test_exec_command_shell(self, mock_spawn, _mock_wait):
+        """test if commands with shell syntax are run through /bin/sh"""
+        self.handler.exec_command("ls *.py | wc -l")
+        mock_spawn.assert_called_with(
+            "/bin/sh",
+            ["/bin/sh", "-c", "ls *.py | wc -l"],
+            os.environ,
+            setsigdef=(signal.SIGINT,),
+        )
+
+    def test_exec_command_inherits_stdout(self):
+        """test if the command writes straight to the shell's stdout fd"""
+        out_path = os.path.join(self.tmpdir, "out")
+        saved_fd = os.dup(1)
+        try:
+            with open(out_path, "w", encoding="utf-8") as out:
+                os.dup2(out.fileno(), 1)
+                self.handler.exec_command("echo streamed")
+        finally:
+            os.dup2(saved_fd, 1)
+            os.close(saved_fd)
+        with open(out_path, "r", encoding="utf-8") as out:
+            self.assertEqual(out.read(), "streamed\n")
+
+    def test_exec_command_waits_through_sigint(self):
+        """test if Ctrl-C reaches only the child and the shell waits for it"""
+        out_path = os.path.join(self.tmpdir, "out")
+        previous = signal.getsignal(signal.SIGINT)
+        timer = threading.Timer(0.1, os.kill, (os.getpid(), signal.SIGINT))
+        timer.start()
+        try:
+            self.handler.exec_command(f"trap '' INT; sleep 0.3; echo done > {out_path}")
+        finally:
+            timer.cancel()
+        with open(out_path, "r", encoding="utf-8") as out:
+            self.assertEqual(out.read(), "done\n")
+        self.assertIs(signal.getsignal(signal.SIGINT), previous)
+
+    @patch("os.waitpid", return_value=(1234, signal.SIGINT))
+    @patch("os.posix_spawnp", return_value=1234)
+    def test_exec_command_interrupted(self, _mock_spawn, _mock_wait):
+        """test if a child killed by Ctrl-C is reported"""
+        with patch("builtins.print") as mock_print:
+            self.handler.exec_command("sleep 10")
+        mock_print.assert_called_with("Process terminated")
+
+    @patch("os.posix_spawnp", side_effect=FileNotFoundError)
+    def test_exec_command_not_found(self, _mock_spawn):
+        """test if a missing command is reported"""
+        with patch("builtins.print") as mock_print:
+            result = self.handler.exec_command("nonexistent_cmd -a -b")
+        self.assertTrue(result)
+        mock_print.assert_called_with("Could not find command: nonexistent_cmd")
+
+    def test_split_command(self):
+        """test if commands are split into argv"""
+        self.assertEqual(_split_command("ls -l -a"), ["ls", "-l", "-a"])
+        self.assertEqual(_split_command("echo 'a b' c"), ["echo", "a b", "c"])
+        self.assertEqual(_split_command(r"echo a\ b"), ["echo", "a b"])
+        self.assertEqual(_split_command("echo 'unclosed"), [])
 
     def test_ch_dir(self):
         """test change directory implementation"""
         with tempfile.TemporaryDirectory() as tmpdirname:
             self.handler.ch_dir(tmpdirname)
             self.assertEqual(os.getcwd(), tmpdirname)
-            self.assertIn(f"cd {tmpdirname}", self.handler.history_settings["history"])
+            self.assertIn(f"cd {tmpdirname}", self.handler.history)
 
         try:
             self.handler.ch_dir("/nonexistent_directory")
@@ -59,64 +139,298 @@ class TestYsh(unittest.TestCase):
 
     def test_process_key(self):
         """test if key press is properly stored and processed in the buffer"""
-        self.handler.buffer = list("echo Hello")
+        self.handler.buffer = "echo Hello"
         self.handler.process_key("enter")
-        self.assertIn("echo Hello", self.handler.history_settings["history"])
+        self.assertIn("echo Hello", self.handler.history)
 
-        self.handler.buffer = list("cd /tmp")
+        self.handler.buffer = "cd /tmp"
         self.handler.process_key("enter")
-        self.assertIn("cd /tmp", self.handler.history_settings["history"])
+        self.assertIn("cd /tmp", self.handler.history)
+
+    def test_process_key_edits_buffer(self):
+        """test if typed and deleted keys update the buffer per character"""
+        for key in ["e", "c", "h", "o", " ", "é", "ü"]:
+            self.handler.process_key(key)
+        self.assertEqual(self.handler.buffer, "echo éü")
+        self.handler.process_key("backspace")
+        self.assertEqual(self.handler.buffer, "echo é")
+
+    def test_backspace_output(self):
+        """test if backspace only redraws the line when the highlight changes"""
+        self.handler.buffer = "echo hi"
+        with patch.object(CommandHandler, "_emit") as mock_emit:
+            self.handler.process_key("backspace")
+        mock_emit.assert_called_once_with("\b \b")
+
+        self.handler.buffer = "ls"
+        self.handler.command = "ls"
+        with patch.object(CommandHandler, "_emit") as mock_emit:
+            self.handler.process_key("backspace")
+        self.assertEqual(self.handler.command, "")
+        mock_emit.assert_called_once_with("\r\033[K\033[93m" + ysh.PROMPT + "\033[0ml")
+
+    def test_colorize_command(self):
+        """test if a recognized command is highlighted without padding"""
+        with patch.object(CommandHandler, "_emit") as mock_emit:
+            for key in "cd":
+                self.handler.process_key(key)
+        mock_emit.assert_called_with(
+            "\r\033[93m" + ysh.PROMPT + "\033[0m\033[91mcd\033[0m\033[K"
+        )
+
+    def test_history_burst_renders_once(self):
+        """test if a burst of arrow keys only draws the final entry"""
+        self.handler.history.extend(["cmd1", "cmd2", "cmd3"])
+        self.handler.history_index = 3
+        with patch.object(CommandHandler, "_emit") as mock_emit:
+            for _ in range(3):
+                self.handler.process_key("up")
+            mock_emit.assert_not_called()
+            self.handler.refresh()
+        mock_emit.assert_called_once_with(
+            "\r\033[K\033[93m" + ysh.PROMPT + "\033[0mcmd1"
+        )
+
+    def test_process_key_ignored_keys(self):
+        """test if navigation keys without a handler leave the buffer alone"""
+        self.handler.buffer = "ls"
+        for key in ["left", "right", "home", "end", "delete"]:
+            self.handler.process_key(key)
+        self.assertEqual(self.handler.buffer, "ls")
 
     def test_handle_history_event(self):
         """test if the history is properly retrieved"""
-        self.handler.history_settings["history"] = ["cmd1", "cmd2", "cmd3"]
-        self.handler.history_settings["history_index"] = 3
+        self.handler.history = ["cmd1", "cmd2", "cmd3"]
+        self.handler.history_index = 3
         self.handler.handle_history_event("up")  # initial up will bring up last command
-        self.assertEqual(
-            self.handler.buffer, list(self.handler.history_settings["history"][2])
-        )
+        self.assertEqual(self.handler.buffer, self.handler.history[2])
         self.handler.handle_history_event("up")
-        self.assertEqual(
-            self.handler.buffer, list(self.handler.history_settings["history"][1])
-        )
+        self.assertEqual(self.handler.buffer, self.handler.history[1])
 
         self.handler.handle_history_event("down")
-        self.assertEqual(
-            self.handler.buffer, list(self.handler.history_settings["history"][2])
-        )
+        self.assertEqual(self.handler.buffer, self.handler.history[2])
 
-        self.handler.history_settings["history_index"] = 3
         self.handler.handle_history_event("down")
-        self.assertEqual(
-            self.handler.buffer, list(self.handler.history_settings["history"][2])
-        )
+        self.assertEqual(self.handler.buffer, "")
+        self.assertEqual(self.handler.history_index, 3)
+
+        self.handler.handle_history_event("up")
+        self.assertEqual(self.handler.buffer, self.handler.history[2])
+
+        # re-running a recalled command leaves the cursor after the last entry
+        with patch.object(ysh.CommandHandler, "_run_subprocess", return_value=0):
+            self.handler.process_key("enter")
+        self.handler.handle_history_event("up")
+        self.assertEqual(self.handler.buffer, "cmd3")
 
-        self.handler.history_settings["history"] = []
+        self.handler.history = []
         self.handler.handle_history_event("down")
-        self.assertEqual(self.handler.buffer, list(""))
+        self.assertEqual(self.handler.buffer, "")
 
         self.handler.handle_history_event("up")
-        self.assertEqual(self.handler.buffer, list(""))
+        self.assertEqual(self.handler.buffer, "")
 
-    @patch("os.listdir")
-    def test_tab_completion(self, mock_listdir):
-        """mock tab functionality"""
-        mock_listdir.return_value = ["file1.txt", "file2.txt", "directory"]
-        self.handler.buffer = list("cd fi")
+    def test_esc_not_inserted(self):
+        """test if esc leaves the buffer untouched, exiting is left to on_release"""
+        self.handler.buffer = "ls"
+        self.handler.process_key("esc")
+        self.assertEqual(self.handler.buffer, "ls")
+
+    def test_read_histsize(self):
+        """test if a bad YSH_HISTSIZE falls back to a usable size"""
+        for value, expected in (("10", 10), ("abc", 5000), ("-1", 0)):
+            with patch.dict(os.environ, {"YSH_HISTSIZE": value}):
+                self.assertEqual(_read_histsize(), expected)
+
+    def test_tab_completion(self):
+        """test tab functionality"""
+        for name in ["file1.txt", "file2.txt"]:
+            with open(os.path.join(self.tmpdir, name), "w", encoding="utf-8"):
+                pass
+        os.mkdir(os.path.join(self.tmpdir, "directory"))
+        os.chdir(self.tmpdir)
+        self.handler.buffer = "cd fi"
         self.handler.handle_tab_event()
-        self.assertEqual(self.handler.buffer, list("cd file"))
+        self.assertEqual(self.handler.buffer, "cd file")
+
+        self.handler.buffer = "cd di"
+        self.handler.handle_tab_event()
+        self.assertEqual(self.handler.buffer, "cd directory/")
+
+    def test_command_completions(self):
+        """test if command names are looked up by prefix"""
+        self.handler._load_commands()  # pylint: disable=protected-access
+        self.assertEqual(self.handler.get_command_completions("hist"), ["history"])
+        self.assertEqual(self.handler.get_command_completions("e"), ["echo", "exit"])
+
+    def test_tab_without_prefix_cmd(self):
+        """test if tab leaves a bare command name untouched"""
+        self.handler._load_commands()  # pylint: disable=protected-access
+        self.handler.buffer = "hist"
+        self.handler.handle_tab_event()
+        self.assertEqual(self.handler.buffer, "hist")
+
+    def test_completions_unlistable(self):
+        """test if paths that cannot be listed complete to nothing"""
+        afile = os.path.join(self.tmpdir, "afile")
+        with open(afile, "w", encoding="utf-8"):
+            pass
+        self.assertEqual(self.handler.get_completions(afile + "/x"), [])
+        self.assertEqual(self.handler.get_completions("missing/x"), [])
+        gone = os.path.join(self.tmpdir, "gone")
+        os.mkdir(gone)
+        os.chdir(gone)
+        os.rmdir(gone)
+        self.assertEqual(self.handler.get_completions("x"), [])
+
+    def test_completions_cached(self):
+        """test if an unchanged directory is only listed once"""
+        with open(os.path.join(self.tmpdir, "file1.txt"), "w", encoding="utf-8"):
+            pass
+        prefix = os.path.join(self.tmpdir, "fi")
+        self.assertEqual(
+            self.handler.get_completions(prefix),
+            [os.path.join(self.tmpdir, "file1.txt")],
+        )
+        with patch("os.scandir") as mock_scandir:
+            self.handler.get_completions(prefix)
+        mock_scandir.assert_not_called()
+
+    def test_completions_cache_bounded(self):
+        """test if the least recently completed directories are dropped"""
+        # pylint: disable=protected-access
+        size = ysh._LISTDIR_CACHE_SIZE
+        dirs = [os.path.join(self.tmpdir, f"dir{i}") for i in range(size + 1)]
+        for dirname in dirs:
+            os.mkdir(dirname)
+            self.handler.get_completions(dirname + os.path.sep)
+        cache = self.handler._listdir_cache
+        self.assertEqual(len(cache), size)
+        self.assertNotIn(dirs[0], cache)
+        self.assertIn(dirs[-1], cache)
+
+    def test_common_prefix(self):
+        """test the longest common prefix of completions"""
+        self.assertEqual(_common_prefix(["file2.txt", "file1.txt", "files"]), "file")
+        self.assertEqual(_common_prefix(["abc"]), "abc")
+        self.assertEqual(_common_prefix(["ab", "abc"]), "ab")
+        self.assertEqual(_common_prefix(["x", "y"]), "")
+        self.assertEqual(_common_prefix([]), "")
+
+    def test_prefix_matches(self):
+        """test the sorted prefix lookup"""
+        entries = ["bin", "file1.txt", "file2.txt", "files", "g"]
+        self.assertEqual(
+            _prefix_matches(entries, "fil"), ["file1.txt", "file2.txt", "files"]
+        )
+        self.assertEqual(_prefix_matches(entries, "x"), [])
+        self.assertEqual(_prefix_matches(entries, ""), entries)
 
     def test_save_and_load_history(self):
         """test if the history is persistent"""
         test_history = ["echo Hello", "ls", "cd /"]
-        self.handler.init_history()
-        self.handler.history_settings["history"].extend(test_history[:])
+        for cmd in test_history:
+            self.handler.add_history(cmd)
         self.handler.save_history()
 
         handler2 = CommandHandler()
         handler2.init_history()
 
-        self.assertEqual(handler2.history_settings["history"][-3:], test_history)
+        handler2.save_history()
+
+        self.assertEqual(list(handler2.history)[-3:], test_history)
+
+    def test_history_file_private(self):
+        """test if a new history file is only accessible by its owner"""
+        self.assertEqual(os.stat(ysh.HIST_PATH).st_mode & 0o777, 0o600)
+
+    def test_add_history_writes_immediately(self):
+        """test if commands reach the history file before the shell exits"""
+        self.handler.add_history("echo Hello")
+        with open(ysh.HIST_PATH, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "echo Hello\n")
+
+    @patch("app.ysh.HISTSIZE", 2)
+    def test_init_history_reads_tail(self):
+        """test if only the last HISTSIZE commands are loaded"""
+        with open(ysh.HIST_PATH, "w", encoding="utf-8") as f:
+            f.write("x" * 1000 + "\nls\npwd\ncd /\n")
+        self.handler.history.clear()
+        self.handler.init_history()
+        self.assertEqual(list(self.handler.get_history()), ["pwd", "cd /"])
+        self.handler.handle_history_event("up")
+        self.assertEqual(self.handler.buffer, "cd /")
+
+    @patch("app.ysh.Commands")
+    def test_commands_singleton(self, mock_commands):
+        """test if scanned commands are merged with the builtins once"""
+        # pylint: disable=protected-access
+        mock_commands.return_value.get_commands.return_value = {"ls": "/bin/ls"}.keys()
+        self.commands_patch.stop()
+        ysh._get_commands_singleton.cache_clear()
+        try:
+            commands = ysh._get_commands_singleton()
+            self.assertEqual(commands, {"ls", "cd", "history", "exit"})
+            self.assertIs(ysh._get_commands_singleton(), commands)
+        finally:
+            ysh._get_commands_singleton.cache_clear()
+            self.commands_patch.start()
+        mock_commands.assert_called_once()
+
+    def test_load_commands_with_alias(self):
+        """test if aliases are added without touching the shared command set"""
+        # pylint: disable=protected-access
+        self.handler.alias_cmds = {"ll": "ls -l"}
+        self.handler._load_commands()
+        self.assertIn("ll", self.handler.commands)
+        self.assertNotIn("ll", ysh._get_commands_singleton())
+
+    @patch("app.ysh.HISTSIZE", 3)
+    def test_history_bounded(self):
+        """test if only the last HISTSIZE commands are kept in memory"""
+        handler = CommandHandler()
+        for cmd in ["a", "b", "c", "d", "e"]:
+            handler.add_history(cmd)
+        handler.save_history()
+        self.assertEqual(list(handler.get_history()), ["c", "d", "e"])
+        with open(ysh.HIST_PATH, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read().split(), ["a", "b", "c", "d", "e"])
+
+    def test_read_tail_lines(self):
+        """test if the last lines of a file are returned"""
+        path = Path(self.tmpdir, "lines")
+        path.write_text("a\nb\nc\n", encoding="utf-8")
+        self.assertEqual(_read_tail_lines(str(path), 2), ["b", "c"])
+        self.assertEqual(_read_tail_lines(str(path), 5), ["a", "b", "c"])
+        path.write_text("a\nb", encoding="utf-8")
+        self.assertEqual(_read_tail_lines(str(path), 1), ["b"])
+        path.write_text("", encoding="utf-8")
+        self.assertEqual(_read_tail_lines(str(path), 1), [])
+        self.assertEqual(_read_tail_lines(os.path.join(self.tmpdir, "missing"), 1), [])
+
+    def test_add_history_skips_duplicates(self):
+        """test if consecutive duplicate commands are stored once"""
+        self.handler.add_history("ls")
+        self.handler.add_history("ls")
+        self.handler.add_history("pwd")
+        self.handler.add_history("ls")
+        self.assertEqual(list(self.handler.get_history()), ["ls", "pwd", "ls"])
+        with open(ysh.HIST_PATH, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "ls\npwd\nls\n")
+
+    def test_print_history(self):
+        """test if the history command prints every entry in one write"""
+        self.handler.history.clear()
+        self.handler.add_history("ls")
+        with patch("sys.stdout") as mock_stdout:
+            self.handler.exec_command("history")
+        mock_stdout.write.assert_called_once_with("ls\nhistory\n")
+
+    def test_exec_command_skips_duplicate_history(self):
+        """test if rerunning the history command is recorded once"""
+        self.handler.exec_command("history")
+        self.handler.exec_command("history")
+        self.assertEqual(list(self.handler.get_history()).count("history"), 1)
 
 
 if __name__ == "__main__":